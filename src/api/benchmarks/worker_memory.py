@@ -0,0 +1,198 @@
+"""
+Benchmark resident memory per worker with and without preloading.
+
+Forks a number of worker processes the same way gunicorn does and reports
+RSS, PSS (RSS with shared pages split between the processes sharing them)
+and private memory for each worker, read from /proc/<pid>/smaps_rollup (Linux).
+
+In "fork-then-load" mode every worker loads the spaCy pipeline and
+scikit-learn itself. In "preload" mode the master loads them before forking
+(as gunicorn.conf.py does), so workers share those pages copy-on-write.
+
+The benchmark exits with a non-zero status if any worker or mode fails.
+
+Usage (from src/api):
+    python -m benchmarks.worker_memory --workers 4 [--spacy-model PATH]
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+import traceback
+
+SAMPLE_TEXT = (
+    "Explain why the sky is blue. Keep it short. "
+    "Mention Rayleigh scattering and the wavelength of light."
+)
+
+
+def read_memory(pid):
+    """
+    Read memory counters of a process in MiB.
+
+    Args:
+        pid: Process id.
+
+    Returns:
+        Dictionary with "rss", "pss", "private" and "shared".
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def worker(ready_fd, preloaded, spacy_model):
+    """
+    Worker body: load dependencies if needed, run a segmentation workload, then wait.
+
+    Args:
+        ready_fd: Pipe file descriptor to signal readiness on.
+        preloaded: Whether the master already loaded the dependencies.
+        spacy_model: Name (or path) of the spaCy model.
+    """
+    from utils.prefork import preload
+    from clime.segmenter import get_segmenter
+
+    if not preloaded:
+        preload(spacy_model)
+
+    # Touch the pipeline like a request would
+    segmenter = get_segmenter(spacy_model)
+    for segment_type in ("s", "w"):
+        segmenter.segment_text(SAMPLE_TEXT, segment_type)
+
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
+    signal.pause()
+
+
+def stop_workers(pids):
+    """
+    Terminate workers and check that none of them failed.
+
+    Args:
+        pids: Worker process ids.
+
+    Raises:
+        RuntimeError: If a worker exited with an error instead of being terminated.
+    """
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    failed = []
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        terminated = os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGTERM
+        if not terminated and os.waitstatus_to_exitcode(status) != 0:
+            failed.append(pid)
+
+    if failed:
+        raise RuntimeError(f"Workers {failed} exited with an error")
+
+
+def run(num_workers, preloaded, spacy_model):
+    """
+    Fork workers and measure their memory.
+
+    Args:
+        num_workers: Number of workers to fork.
+        preloaded: Load dependencies in the master before forking.
+        spacy_model: Name (or path) of the spaCy model.
+
+    Returns:
+        List of memory dictionaries, one per worker.
+
+    Raises:
+        RuntimeError: If a worker fails before it is ready or while it runs.
+    """
+    if preloaded:
+        from utils.prefork import freeze_heap, preload
+        preload(spacy_model)
+        freeze_heap()
+
+    pids = []
+    try:
+        for _ in range(num_workers):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                try:
+                    worker(write_fd, preloaded, spacy_model)
+                except BaseException:
+                    traceback.print_exc()
+                    os._exit(1)
+                os._exit(0)
+            pids.append(pid)
+            os.close(write_fd)
+            ready = os.read(read_fd, 1)
+            os.close(read_fd)
+            if ready != b"1":
+                raise RuntimeError(f"Worker {pid} exited before it was ready")
+
+        # Let the workers settle before sampling
+        time.sleep(1)
+        results = [read_memory(pid) for pid in pids]
+    finally:
+        stop_workers(pids)
+
+    return results
+
+
+def report(mode, results):
+    """Print per-worker memory and totals for one mode."""
+    print(f"\n{mode}")
+    print(f"{'worker':>6} {'RSS MiB':>10} {'PSS MiB':>10} {'private MiB':>12} {'shared MiB':>11}")
+    for idx, mem in enumerate(results, 1):
+        print(f"{idx:>6} {mem['rss']:>10.1f} {mem['pss']:>10.1f} {mem['private']:>12.1f} {mem['shared']:>11.1f}")
+    total_pss = sum(mem["pss"] for mem in results)
+    print(f"{'total':>6} {'':>10} {total_pss:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="Number of workers to fork")
+    parser.add_argument("--spacy-model", default="en_core_web_sm", help="Name or path of the spaCy model")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("This benchmark needs Linux /proc/<pid>/smaps_rollup")
+
+    # Each mode runs in a fresh process so the master starts from the same state
+    failed = []
+    for mode, preloaded in (("fork-then-load", False), ("preload", True)):
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                report(mode, run(args.workers, preloaded, args.spacy_model))
+                sys.stdout.flush()
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            failed.append(mode)
+
+    if failed:
+        sys.exit(f"Benchmark failed for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
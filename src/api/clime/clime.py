@@ -5,7 +5,7 @@ C-LIME explainer for text generation models.
 import numpy as np
 from typing import List, Dict, Any, Union
 
-from clime.segmenter import SpaCySegmenter, exclude_non_alphanumeric
+from clime.segmenter import get_segmenter, exclude_non_alphanumeric
 from clime.subset_utils import sample_subsets, mask_subsets
 from clime.linear_model import compute_linear_model_features, fit_linear_model
 
@@ -28,7 +28,7 @@ class CLIME:
             segmenter: Name of spaCy model for segmentation.
         """
         self.model = model
-        self.segmenter = SpaCySegmenter(segmenter)
+        self.segmenter = get_segmenter(segmenter)
 
     def explain_instance(
         self,
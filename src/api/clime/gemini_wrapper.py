@@ -2,11 +2,104 @@
 Gemini model wrapper for C-LIME explainer.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from google import genai
 import numpy as np
 
 
+# Generation settings used for perturbation calls. Only the word overlap with
+# the original answer is needed, so these calls run with capped output, no
+# thinking and deterministic decoding.
+DEFAULT_PERTURBATION_PROFILE = {
+    "max_output_ratio": 1.5,   # Token and word caps relative to the original answer (None = no cap)
+    "min_output_tokens": 32,   # Lower bound for the output token cap (estimated from characters)
+    "min_output_words": 24,    # Lower bound for the word cap applied when reading outputs
+    "thinking_budget": 0,      # 0 disables model thinking (None = model default)
+    "temperature": 0.0,        # Deterministic decoding (None = model default)
+    "early_stop": True,        # Stream the response and stop once the score is determined
+    "score_tolerance": 0.01,   # Maximum width of the score bounds before stopping early
+}
+
+
+def word_set(text: str) -> Set[str]:
+    """
+    Split text into a set of lowercased words.
+
+    Args:
+        text: Input text.
+
+    Returns:
+        Set of words.
+    """
+    return set(text.lower().split())
+
+
+def truncate_words(text: str, max_words: Optional[int]) -> str:
+    """
+    Keep only the first max_words words of a text.
+
+    Args:
+        text: Input text.
+        max_words: Word limit (None = no limit).
+
+    Returns:
+        Text cut to the word limit.
+    """
+    words = text.split()
+    if max_words is None or len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words])
+
+
+def jaccard_similarity(target_words: Set[str], perturbed_words: Set[str]) -> float:
+    """
+    Compute Jaccard similarity between two word sets.
+
+    Args:
+        target_words: Words of the original output.
+        perturbed_words: Words of the perturbed output.
+
+    Returns:
+        Similarity score in [0, 1] (0 if target_words is empty).
+    """
+    if len(target_words) == 0:
+        return 0.0
+    intersection = target_words.intersection(perturbed_words)
+    union = target_words.union(perturbed_words)
+    return len(intersection) / len(union) if len(union) > 0 else 0.0
+
+
+def jaccard_bounds(
+    target_words: Set[str],
+    perturbed_words: Set[str],
+    remaining_words: int
+) -> Tuple[float, float]:
+    """
+    Bound the final Jaccard similarity of a partially received output.
+
+    The lower bound assumes every remaining word is new and outside the
+    target; the upper bound assumes every remaining word hits a target word
+    not seen yet.
+
+    Args:
+        target_words: Words of the original output.
+        perturbed_words: Words of the perturbed output received so far.
+        remaining_words: Maximum number of words still to be received.
+
+    Returns:
+        Tuple (lower, upper) of score bounds.
+    """
+    if len(target_words) == 0:
+        return 0.0, 0.0
+    intersection = len(target_words.intersection(perturbed_words))
+    union = len(target_words.union(perturbed_words))
+    remaining_words = max(remaining_words, 0)
+    gain = min(remaining_words, len(target_words) - intersection)
+    lower = intersection / (union + remaining_words)
+    upper = (intersection + gain) / union
+    return lower, upper
+
+
 class GeminiModelWrapper:
     """
     Wrapper for Gemini model to work with C-LIME explainer.
@@ -17,13 +110,15 @@ class GeminiModelWrapper:
         system_prompt: System instruction for the model.
         original_input: Store original input for context.
         original_output: Store original output for probability computation.
+        perturbation_profile: Generation settings for perturbation calls.
     """
 
     def __init__(
         self,
         client: genai.Client,
         model: str = "gemini-2.5-flash",
-        system_prompt: str = None
+        system_prompt: str = None,
+        perturbation_profile: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize Gemini model wrapper.
@@ -32,10 +127,12 @@ class GeminiModelWrapper:
             client: Google Genai client instance.
             model: Model name to use.
             system_prompt: System instruction for generation.
+            perturbation_profile: Overrides for DEFAULT_PERTURBATION_PROFILE.
         """
         self.client = client
         self.model = model
         self.system_prompt = system_prompt
+        self.perturbation_profile = {**DEFAULT_PERTURBATION_PROFILE, **(perturbation_profile or {})}
         self.original_input = None
         self.original_output = None
 
@@ -82,6 +179,141 @@ class GeminiModelWrapper:
 
         return output_text
 
+    def perturbation_config(self, output_text: str) -> Dict[str, Any]:
+        """
+        Build the generation config for perturbation calls.
+
+        Args:
+            output_text: Original output the perturbed outputs are compared to.
+
+        Returns:
+            Config dictionary for generate_content.
+        """
+        profile = self.perturbation_profile
+        config = {}
+        if self.system_prompt:
+            config["system_instruction"] = self.system_prompt
+
+        if profile["max_output_ratio"] is not None:
+            # Rough token estimate (~4 characters per token) of the original answer
+            estimated_tokens = len(output_text) // 4 + 1
+            config["max_output_tokens"] = max(
+                profile["min_output_tokens"],
+                int(estimated_tokens * profile["max_output_ratio"])
+            )
+        if profile["thinking_budget"] is not None:
+            config["thinking_config"] = {"thinking_budget": profile["thinking_budget"]}
+        if profile["temperature"] is not None:
+            config["temperature"] = profile["temperature"]
+
+        return config
+
+    def _max_output_words(self, target_text: str) -> Optional[int]:
+        """
+        Maximum number of words read from a perturbed output.
+
+        Args:
+            target_text: Original output text.
+
+        Returns:
+            Word limit, or None if output is not capped.
+        """
+        profile = self.perturbation_profile
+        if profile["max_output_ratio"] is None:
+            return None
+        return max(
+            profile["min_output_words"],
+            int(len(target_text.split()) * profile["max_output_ratio"])
+        )
+
+    def _read_until_determined(
+        self,
+        contents: List[Dict[str, Any]],
+        config: Dict[str, Any],
+        target_words: Set[str],
+        max_words: Optional[int]
+    ) -> str:
+        """
+        Stream a perturbed output and stop once its score is determined.
+
+        Reading stops when the word limit is reached or when the bounds on the
+        final Jaccard score are narrower than the profile's score_tolerance.
+
+        Args:
+            contents: Gemini contents for the perturbed input.
+            config: Generation config.
+            target_words: Words of the original output.
+            max_words: Word limit for the output (None = read to the end).
+
+        Returns:
+            Perturbed output text received before stopping.
+        """
+        tolerance = self.perturbation_profile["score_tolerance"]
+        response = self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=config
+        )
+
+        text = ""
+        for chunk in response:
+            if not chunk.text:
+                continue
+            text += chunk.text
+
+            # The last word may continue in the next chunk
+            words = text.lower().split()
+            if words and not text[-1].isspace():
+                words = words[:-1]
+
+            if max_words is not None:
+                if len(words) >= max_words:
+                    return truncate_words(" ".join(words), max_words)
+                lower, upper = jaccard_bounds(target_words, set(words), max_words - len(words))
+                if upper - lower <= tolerance:
+                    return " ".join(words)
+
+        return truncate_words(text, max_words)
+
+    def _generate_perturbed(
+        self,
+        idx: int,
+        total: int,
+        contents: List[Dict[str, Any]],
+        config: Dict[str, Any],
+        target_words: Set[str],
+        max_words: Optional[int]
+    ) -> str:
+        """
+        Generate the output for one perturbed input.
+
+        Args:
+            idx: Index of the perturbed input (for logging).
+            total: Total number of perturbed inputs (for logging).
+            contents: Gemini contents for the perturbed input.
+            config: Generation config.
+            target_words: Words of the original output.
+            max_words: Word limit for the output (None = read to the end).
+
+        Returns:
+            Perturbed output text.
+        """
+        print(f"[LIME] API call {idx}/{total}: Generating for perturbed input...")
+        if self.perturbation_profile["early_stop"]:
+            perturbed_output = self._read_until_determined(
+                contents, config, target_words, max_words
+            )
+        else:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=config
+            )
+            # Same word cap as the streamed read, so early_stop only changes latency
+            perturbed_output = truncate_words(response.text or "", max_words)
+        print(f"[LIME] API call {idx}/{total}: Response received ({len(perturbed_output)} chars)")
+        return perturbed_output
+
     def compute_probabilities(
         self,
         perturbed_inputs: List[List[str]],
@@ -104,6 +336,9 @@ class GeminiModelWrapper:
         """
         scores = []
         total_perturbations = len(perturbed_inputs)
+        config = self.perturbation_config(output_text)
+        target_words = word_set(output_text)
+        max_words = self._max_output_words(output_text)
         print(f"[LIME] Computing probabilities for {total_perturbations} perturbed inputs...")
 
         for idx, perturbed_units in enumerate(perturbed_inputs, 1):
@@ -116,33 +351,14 @@ class GeminiModelWrapper:
                 "parts": [{"text": perturbed_text}]
             }]
 
-            config = {}
-            if self.system_prompt:
-                config["system_instruction"] = self.system_prompt
-
             try:
-                print(f"[LIME] API call {idx}/{total_perturbations}: Generating for perturbed input...")
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=contents,
-                    config=config
+                perturbed_output = self._generate_perturbed(
+                    idx, total_perturbations, contents, config, target_words, max_words
                 )
 
-                perturbed_output = response.text
-                print(f"[LIME] API call {idx}/{total_perturbations}: Response received ({len(perturbed_output)} chars)")
-
                 # Compute similarity score (simple word overlap / Jaccard similarity)
                 # This is a simplified approach - you could use more sophisticated metrics
-                target_words = set(output_text.lower().split())
-                perturbed_words = set(perturbed_output.lower().split())
-
-                if len(target_words) == 0:
-                    score = 0.0
-                else:
-                    # Jaccard similarity
-                    intersection = target_words.intersection(perturbed_words)
-                    union = target_words.union(perturbed_words)
-                    score = len(intersection) / len(union) if len(union) > 0 else 0.0
+                score = jaccard_similarity(target_words, word_set(perturbed_output))
 
                 scores.append(score)
                 print(f"[LIME] Similarity score: {score:.4f}")
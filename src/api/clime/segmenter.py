@@ -1,6 +1,10 @@
 import spacy
 
 
+# Loaded segmenters shared by all explainers in the process
+_SEGMENTERS = {}
+
+
 class SpaCySegmenter:
     """
     Segment input text into units using a spaCy model.
@@ -53,6 +57,24 @@ class SpaCySegmenter:
         return units, unit_types
 
 
+def get_segmenter(spacy_model="en_core_web_sm"):
+    """
+    Return a shared SpaCySegmenter, loading the spaCy model on first use.
+
+    Loading the model once per process (or once before forking workers)
+    avoids reloading the pipeline for every explanation.
+
+    Args:
+        spacy_model: Name of spaCy model to use.
+
+    Returns:
+        SpaCySegmenter instance.
+    """
+    if spacy_model not in _SEGMENTERS:
+        _SEGMENTERS[spacy_model] = SpaCySegmenter(spacy_model)
+    return _SEGMENTERS[spacy_model]
+
+
 def exclude_non_alphanumeric(unit_types, units):
     """
     Mark units without alphanumeric characters as not to be perturbed.
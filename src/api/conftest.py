@@ -0,0 +1,2 @@
+# Lets pytest import the backend packages (clime, utils) the same way main.py does.
+# Run from src/api:  python -m pytest tests
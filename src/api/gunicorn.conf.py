@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for the prefork deployment mode.
+
+The app is imported once in the master with the segmenter and explanation
+dependencies preloaded, then forked into WEB_CONCURRENCY uvicorn workers that
+share those pages copy-on-write. With XEEAI_CACHE=1, explanation results are
+cached in the shared-memory store (utils.cache.SharedCache), so every worker
+sees them.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+"""
+
+import os
+
+# Read by main.py when the app is imported in the master
+os.environ.setdefault("XEEAI_PRELOAD", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# LIME explanations make many sequential API calls per request
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
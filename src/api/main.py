@@ -6,27 +6,16 @@ from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from google import genai
+from utils.cache import SharedCache
+from utils.prefork import freeze_heap, preload
 from utils.stream import stream_chat
 
 load_dotenv(".env")
 
-app = FastAPI()
-
-# Initialize Gemini client
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "https://xai-research.vercel.app", # Put your deployed vercel domain
-    ],
-    allow_origin_regex=r"https://.*\.vercel\.app",  # Allow all Vercel preview deployments
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Customize your system prompt here
+SYSTEM_PROMPT = """
+    Keep your answers as concise as possible.
+    """
 
 
 class Message(BaseModel):
@@ -36,29 +25,82 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: List[Message]
+    compact: bool = False  # Client accepts offset-encoded LIME attributions
 
 
-@app.get("/")
-async def health_check():
-    """Health check endpoint for Render."""
-    return {"status": "ok", "message": "XeeAI Backend is running"}
-
+def create_app(preload_models: bool = False, shared_cache: bool = False) -> FastAPI:
+    """
+    Create the FastAPI application.
 
-@app.post("/")
-async def handle_chat(request: ChatRequest):
-    messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+    Args:
+        preload_models: Load the segmenter and explanation dependencies now
+            instead of on the first explanation.
+        shared_cache: Cache explanation results in a store shared by all
+            workers on the host (prefork mode only).
 
-    # Customize your system prompt here
-    system_prompt = """
-    Keep your answers as concise as possible.
+    Returns:
+        FastAPI application.
     """
+    if preload_models:
+        preload()
+
+    app = FastAPI()
+
+    # Initialize Gemini client
+    client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+
+    # Explanation results shared by all workers on the host
+    cache = None
+    if shared_cache:
+        cache = SharedCache(
+            path=os.environ.get("XEEAI_CACHE_PATH"),
+            ttl=float(os.environ.get("XEEAI_CACHE_TTL", 3600))
+        )
 
-    return StreamingResponse(
-        stream_chat(client, messages, system_prompt),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
\ No newline at end of file
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",
+            "https://xai-research.vercel.app", # Put your deployed vercel domain
+        ],
+        allow_origin_regex=r"https://.*\.vercel\.app",  # Allow all Vercel preview deployments
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.get("/")
+    async def health_check():
+        """Health check endpoint for Render."""
+        return {"status": "ok", "message": "XeeAI Backend is running"}
+
+    @app.post("/")
+    async def handle_chat(request: ChatRequest):
+        messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+
+        return StreamingResponse(
+            stream_chat(client, messages, SYSTEM_PROMPT, compact=request.compact, cache=cache),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
+            }
+        )
+
+    if preload_models:
+        # Everything the workers share is built; freeze it before forking
+        freeze_heap()
+
+    return app
+
+
+# Prefork mode (XEEAI_PRELOAD=1, set by gunicorn.conf.py) preloads models. The
+# shared explanation cache is opt-in (XEEAI_CACHE=1): answers are sampled, so it
+# only hits when the same answer is explained again, e.g. on a client retry
+prefork = os.environ.get("XEEAI_PRELOAD", "0") == "1"
+app = create_app(
+    preload_models=prefork,
+    shared_cache=prefork and os.environ.get("XEEAI_CACHE", "0") == "1"
+)
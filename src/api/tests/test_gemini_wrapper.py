@@ -0,0 +1,148 @@
+"""
+Checks for the perturbation generation profile of GeminiModelWrapper.
+
+A local fake client replaces the Gemini API: it streams preset chunks and
+records how many of them were read and which config was sent.
+"""
+
+import random
+
+from clime.gemini_wrapper import (
+    GeminiModelWrapper,
+    jaccard_bounds,
+    jaccard_similarity,
+    word_set,
+)
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chunks_read = 0
+        self.calls = []
+
+    def generate_content_stream(self, model, contents, config):
+        self.calls.append(("stream", config))
+        for chunk in self.chunks:
+            self.chunks_read += 1
+            yield FakeChunk(chunk)
+
+    def generate_content(self, model, contents, config):
+        self.calls.append(("generate", config))
+        return FakeChunk("".join(self.chunks))
+
+
+class FakeClient:
+    def __init__(self, chunks):
+        self.models = FakeModels(chunks)
+
+
+def score_with(chunks, output_text, **profile):
+    """Score one perturbed input whose model output streams as chunks."""
+    client = FakeClient(chunks)
+    wrapper = GeminiModelWrapper(client, perturbation_profile=profile)
+    scores = wrapper.compute_probabilities([["perturbed input"]], output_text)
+    return float(scores[0]), client.models
+
+
+def test_jaccard_bounds_contain_final_score():
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(12)]
+    target = set(vocab[:6])
+    for _ in range(500):
+        words = [rng.choice(vocab) for _ in range(rng.randint(1, 15))]
+        final = jaccard_similarity(target, set(words))
+        for seen in range(len(words) + 1):
+            lower, upper = jaccard_bounds(target, set(words[:seen]), len(words) - seen)
+            assert lower - 1e-12 <= final <= upper + 1e-12
+
+
+def test_early_stop_within_tolerance_of_full_read():
+    rng = random.Random(1)
+    vocab = [f"w{i}" for i in range(16)]
+    output_text = " ".join(vocab[:10])
+    profile = {"max_output_ratio": 1.0, "min_output_words": 1, "score_tolerance": 0.2}
+    stopped_early = 0
+    for _ in range(200):
+        # A capped model never returns more words than the cap (10 here)
+        words = [rng.choice(vocab) for _ in range(rng.randint(1, 10))]
+        chunks = [word + " " for word in words]
+
+        early, models = score_with(chunks, output_text, **profile)
+        full, _ = score_with(chunks, output_text, early_stop=False, **profile)
+
+        assert abs(early - full) <= profile["score_tolerance"]
+        stopped_early += models.chunks_read < len(chunks)
+
+    assert stopped_early > 0
+
+
+def test_early_stop_does_not_change_over_cap_score():
+    # The target only appears after the word cap, so both paths must ignore it
+    output_text = "a b c d e f g h"
+    chunks = ["filler "] * 8 + [word + " " for word in output_text.split()]
+    profile = {"max_output_ratio": 1.0, "min_output_words": 1}
+
+    early, _ = score_with(chunks, output_text, **profile)
+    full, _ = score_with(chunks, output_text, early_stop=False, **profile)
+
+    assert early == full == 0.0
+
+
+def test_split_word_not_counted_twice():
+    # With a two-word cap, counting "hel"/"wor" as words would stop after the second chunk
+    chunks = ["hel", "lo wor", "ld ", "hel", "lo"]
+    output_text = "hello world"
+    profile = {"max_output_ratio": 1.0, "min_output_words": 1}
+
+    early, models = score_with(chunks, output_text, **profile)
+    full, _ = score_with(chunks, output_text, early_stop=False, **profile)
+
+    assert early == full == 1.0
+    assert models.chunks_read == 3
+
+
+def test_split_word_dropped_at_cap():
+    client = FakeClient(["hello wor", "ld foo ba", "r baz"])
+    wrapper = GeminiModelWrapper(
+        client,
+        perturbation_profile={"max_output_ratio": 1.0, "min_output_words": 1}
+    )
+    target_words = word_set("hello world")
+
+    text = wrapper._read_until_determined([], {}, target_words, max_words=2)
+
+    assert text == "hello world"
+    assert client.models.chunks_read == 2
+
+
+def test_word_cap_stops_long_output():
+    chunks = ["filler "] * 200
+    score, models = score_with(chunks, "short answer here", min_output_words=8)
+
+    assert score == 0.0
+    assert models.chunks_read == 8
+
+
+def test_perturbation_config():
+    chunks = ["the answer"]
+    _, models = score_with(chunks, "the answer " * 40)
+    kind, config = models.calls[0]
+
+    assert kind == "stream"
+    assert config["thinking_config"] == {"thinking_budget": 0}
+    assert config["temperature"] == 0.0
+    assert config["max_output_tokens"] == int((len("the answer " * 40) // 4 + 1) * 1.5)
+
+
+def test_early_stop_disabled_reads_full_response():
+    chunks = ["the cat ", "sat on ", "a mat"]
+    score, models = score_with(chunks, "the cat sat on the mat", early_stop=False)
+
+    assert [kind for kind, _ in models.calls] == ["generate"]
+    assert score == jaccard_similarity(word_set("the cat sat on the mat"), word_set("the cat sat on a mat"))
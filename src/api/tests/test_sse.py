@@ -0,0 +1,68 @@
+"""
+Checks for SSE chunk coalescing and the compact attribution encoding.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.sse import SSEWriter, encode_attributions
+
+
+async def timed_chunks(schedule):
+    """Yield (delay, text) pairs from schedule, sleeping before each chunk."""
+    for delay, text in schedule:
+        await asyncio.sleep(delay)
+        yield text
+
+
+async def collect(writer, chunks):
+    """Collect (seconds since start, text) for every coalesced frame."""
+    start = time.monotonic()
+    return [(time.monotonic() - start, text) async for text in writer.coalesce(chunks)]
+
+
+def test_coalesce_joins_bursts_and_flushes_on_timeout():
+    writer = SSEWriter(flush_interval=0.05)
+    schedule = [(0, "a"), (0, "b"), (0.3, "c"), (0, "d")]
+
+    frames = asyncio.run(collect(writer, timed_chunks(schedule)))
+
+    assert [text for _, text in frames] == ["ab", "cd"]
+    # "ab" goes out after one flush interval, not when "c" arrives
+    assert frames[0][0] < 0.2
+
+
+def test_coalesce_flushes_at_max_buffer():
+    writer = SSEWriter(flush_interval=10, max_buffer=2)
+    schedule = [(0, "ab"), (0, "c"), (0, "d")]
+
+    frames = asyncio.run(collect(writer, timed_chunks(schedule)))
+
+    assert [text for _, text in frames] == ["ab", "cd"]
+
+
+def test_coalesce_sends_buffer_before_error():
+    async def failing():
+        yield "partial"
+        raise ValueError("stream failed")
+
+    async def run():
+        received = []
+        with pytest.raises(ValueError):
+            async for text in SSEWriter().coalesce(failing()):
+                received.append(text)
+        return received
+
+    assert asyncio.run(run()) == ["partial"]
+
+
+def test_encode_attributions_uses_utf16_offsets():
+    units = ["héllo ", "😀 ", "world"]
+
+    encoded = encode_attributions("".join(units), units, [0.12345, -0.5, 0.0])
+
+    assert encoded["offsets"] == [0, 6, 9, 14]
+    assert encoded["scores"] == [1234, -5000, 0]
+    assert encode_attributions("other text", units, [0.0] * 3) is None
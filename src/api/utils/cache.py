@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Optional
+
+
+# Writes between two prune passes (per process)
+PRUNE_EVERY = 20
+
+
+def default_cache_path() -> str:
+    """Per-user cache file in shared memory (/dev/shm) when available, else the temp directory."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"xeeai-{os.getuid()}", "cache.sqlite3")
+
+
+def _secure_cache_file(path: str) -> None:
+    """
+    Create the cache file readable and writable by the current user only.
+
+    The directory is created with mode 0700 if missing. Directories that are
+    owned by another user or writable by others are rejected, since anyone
+    who can replace the file could read prompts or poison cached results.
+
+    Args:
+        path: Path of the SQLite database file.
+
+    Raises:
+        PermissionError: If the directory or file is not private to the current user.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    st = os.stat(directory)
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"Cache directory {directory} must be owned by the current user and not writable by others")
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        if os.fstat(fd).st_uid != os.getuid():
+            raise PermissionError(f"Cache file {path} is owned by another user")
+        # SQLite creates its -wal and -shm files with the same permissions
+        os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
+
+
+class SharedCache:
+    """
+    Key-value cache shared by all worker processes on the host.
+
+    Entries live in a SQLite database on a shared-memory filesystem, so every
+    worker forked from the same app sees the same explanation results. The
+    file is private to the current user. Every lookup and store opens and
+    closes its own connection, so no connection is held per thread or shared
+    across a fork.
+
+    Attributes:
+        path: Path of the SQLite database file.
+        ttl: Seconds before an entry expires.
+        max_entries: Maximum number of entries kept per namespace.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600, max_entries: int = 10000):
+        """
+        Initialize shared cache.
+
+        Args:
+            path: Path of the SQLite database file (None = default_cache_path()).
+            ttl: Seconds before an entry expires.
+            max_entries: Maximum number of entries kept per namespace.
+        """
+        self.path = path or default_cache_path()
+        _secure_cache_file(self.path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+
+        conn = self._connect()
+        try:
+            # WAL mode is stored in the database file, so it is set once here
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, value TEXT, expires REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection for a single lookup or store."""
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash JSON-serializable parts into a cache key."""
+        data = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            namespace: Cache namespace (e.g. "explanation").
+            key: Cache key from make_key().
+
+        Returns:
+            Cached value, or None if missing or expired.
+        """
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+                    (namespace, key, time.time())
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[CACHE] Lookup failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            namespace: Cache namespace.
+            key: Cache key from make_key().
+            value: Value to store.
+        """
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), now + self.ttl)
+                )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune(conn, now)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[CACHE] Store failed: {e}")
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries and keep only the newest max_entries of every namespace."""
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE rowid IN ("
+            "SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER ("
+            "PARTITION BY namespace ORDER BY expires DESC) AS rank FROM cache) "
+            "WHERE rank > ?)",
+            (self.max_entries,)
+        )
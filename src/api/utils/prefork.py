@@ -0,0 +1,28 @@
+import gc
+
+
+def preload(spacy_model="en_core_web_sm"):
+    """
+    Load the segmenter and explanation dependencies into the current process.
+
+    Under a prefork server (gunicorn --preload) this runs once in the master, so
+    the spaCy pipeline and scikit-learn are shared copy-on-write by all workers.
+
+    Args:
+        spacy_model: Name (or path) of the spaCy model used for segmentation.
+    """
+    from clime.segmenter import get_segmenter
+    import clime.linear_model  # noqa: F401 (imports scikit-learn)
+
+    get_segmenter(spacy_model)
+
+
+def freeze_heap():
+    """
+    Move every object in the process out of the garbage collector's generations.
+
+    Call this last in the master, after everything shared with the workers is
+    built, so collections in the workers do not touch (and copy) those pages.
+    """
+    gc.collect()
+    gc.freeze()
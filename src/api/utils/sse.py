@@ -0,0 +1,172 @@
+import asyncio
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, fall back to the standard library
+    orjson = None
+
+
+# Marks the end of the model stream in SSEWriter.coalesce
+_END = object()
+
+# Fixed-point scale for scores in the compact attribution encoding (4 decimals)
+SCORE_SCALE = 10000
+
+
+def dumps(data: Any) -> str:
+    """Serialize data to compact JSON, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def format_sse(data: Dict[str, Any]) -> str:
+    """Format data as Server-Sent Event."""
+    return f"data: {dumps(data)}\n\n"
+
+
+def encode_attributions(
+    input_text: str,
+    units: List[str],
+    scores: List[float]
+) -> Optional[Dict[str, Any]]:
+    """
+    Encode LIME attributions compactly as offsets into the input text.
+
+    Units returned by the segmenter are contiguous slices of the input, so
+    only their boundaries are sent. Offsets are counted in UTF-16 code units
+    to match JavaScript string indexing on the client. Scores are sent as
+    integers scaled by SCORE_SCALE.
+
+    Args:
+        input_text: Input text the units were segmented from.
+        units: List of text units.
+        scores: Attribution score for each unit.
+
+    Returns:
+        Dictionary with "format", "offsets", "scores" and "scale", or None
+        if the units do not reconstruct the input text.
+    """
+    if "".join(units) != input_text:
+        return None
+
+    offsets = [0]
+    for unit in units:
+        offsets.append(offsets[-1] + len(unit.encode("utf-16-le")) // 2)
+
+    return {
+        "format": "offsets",
+        "offsets": offsets,
+        "scores": [round(score * SCORE_SCALE) for score in scores],
+        "scale": SCORE_SCALE
+    }
+
+
+class SSEWriter:
+    """
+    Server-Sent Event writer that coalesces content chunks.
+
+    Chunks from the async model stream that arrive within flush_interval
+    seconds of each other are joined into one "content" frame, so text never
+    waits longer than flush_interval before it is sent. A frame is also sent as
+    soon as max_buffer characters are buffered. Waiting happens on the event
+    loop, so coalescing needs no extra thread per connection.
+
+    Attributes:
+        flush_interval: Maximum seconds text waits for more chunks.
+        max_buffer: Buffered characters that force a content frame.
+    """
+
+    def __init__(self, flush_interval: float = 0.05, max_buffer: int = 512):
+        """
+        Initialize SSE writer.
+
+        Args:
+            flush_interval: Maximum seconds text waits for more chunks (0 = no coalescing).
+            max_buffer: Buffered characters that force a content frame.
+        """
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+    async def coalesce(self, chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+        """
+        Join text chunks that arrive close together.
+
+        Args:
+            chunks: Text chunks from the async model stream.
+
+        Yields:
+            Joined text, at most flush_interval seconds after its first chunk.
+        """
+        if self.flush_interval <= 0:
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        iterator = chunks.__aiter__()
+        pending = None
+        buffer = []
+        buffered_chars = 0
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(anext(iterator, _END))
+
+                try:
+                    if buffer:
+                        # shield() keeps the read going when the wait times out
+                        item = await asyncio.wait_for(asyncio.shield(pending), self.flush_interval)
+                    else:
+                        item = await pending
+                except asyncio.TimeoutError:
+                    yield "".join(buffer)
+                    buffer, buffered_chars = [], 0
+                    continue
+                except Exception:
+                    # Send what was received before the stream failed
+                    pending = None
+                    if buffer:
+                        yield "".join(buffer)
+                    raise
+                pending = None
+
+                if item is _END:
+                    if buffer:
+                        yield "".join(buffer)
+                    return
+
+                buffer.append(item)
+                buffered_chars += len(item)
+                if buffered_chars >= self.max_buffer:
+                    yield "".join(buffer)
+                    buffer, buffered_chars = [], 0
+        finally:
+            # Stop reading if the client disconnects mid-stream
+            if pending is not None:
+                pending.cancel()
+
+    def content(self, text: str) -> str:
+        """
+        Format a content frame.
+
+        Args:
+            text: Text to send.
+
+        Returns:
+            SSE frame.
+        """
+        return format_sse({"type": "content", "text": text})
+
+    def event(self, data: Dict[str, Any]) -> str:
+        """
+        Format a non-content event.
+
+        Args:
+            data: Event payload.
+
+        Returns:
+            SSE frame.
+        """
+        return format_sse(data)
@@ -1,24 +1,130 @@
-import json
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 from google import genai
+from starlette.concurrency import run_in_threadpool
 from clime.clime import CLIME
 from clime.gemini_wrapper import GeminiModelWrapper
+from utils.cache import SharedCache
+from utils.sse import SSEWriter, encode_attributions
 
 
-def stream_chat(
+def explain_response(
+    client: genai.Client,
+    last_user_input: str,
+    full_response: str,
+    system_prompt: str,
+    perturbation_profile: Optional[Dict[str, Any]] = None,
+    cache: Optional[SharedCache] = None
+) -> Dict[str, Any]:
+    """
+    Run the C-LIME explanation of a response (blocking, many API calls).
+
+    Args:
+        client: Google Genai client.
+        last_user_input: User message to attribute the response to.
+        full_response: Model response to explain.
+        system_prompt: System instruction used for the response.
+        perturbation_profile: Overrides for the perturbation generation profile.
+        cache: Optional cache of explanation results shared across workers.
+
+    Returns:
+        C-LIME result dictionary (see CLIME.explain_instance).
+    """
+    # Create model wrapper
+    model_wrapper = GeminiModelWrapper(
+        client=client,
+        model="gemini-2.5-flash",
+        system_prompt=system_prompt,
+        perturbation_profile=perturbation_profile  # Lean generation settings for perturbation calls
+    )
+
+    # Initialize CLIME explainer
+    print("[LIME] Initializing CLIME explainer...")
+    explainer = CLIME(model=model_wrapper, segmenter="en_core_web_sm")
+
+    # Adaptive segment selection based on input length
+    # Count sentences in input
+    import re
+    sentences = re.split(r'[.!?]+', last_user_input.strip())
+    sentences = [s.strip() for s in sentences if s.strip()]
+    num_sentences = len(sentences)
+
+    # Count words in input
+    words = last_user_input.split()
+    num_words = len(words)
+
+    # Decision logic: Use word-level for short inputs, sentence-level for long
+    if num_sentences <= 1 or num_words < 15:
+        segment_type = "w"  # Word-level for short inputs
+        oversampling_factor = 1  # Fewer perturbations for word-level (can be many words)
+        print(f"[LIME] Using WORD-level segmentation (input: {num_words} words, {num_sentences} sentence)")
+    else:
+        segment_type = "s"  # Sentence-level for longer inputs
+        oversampling_factor = 2  # More perturbations for sentence-level
+        print(f"[LIME] Using SENTENCE-level segmentation (input: {num_words} words, {num_sentences} sentences)")
+
+    # Generate explanation
+    # OPTIMIZATION: Lower values = faster but less accurate
+    # - oversampling_factor: Number of perturbations per unit (2-3 = fast, 5-10 = accurate)
+    # - segment_type: "w" for words (more units) or "s" for sentences (fewer units, faster)
+    # - max_units_replace: How many units to mask at once (1 = fastest)
+    import time
+    start_time = time.time()
+    cache_key = None
+    lime_result = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            last_user_input, full_response, system_prompt,
+            segment_type, oversampling_factor, perturbation_profile
+        )
+        lime_result = cache.get("explanation", cache_key)
+        if lime_result is not None:
+            print("[LIME] Using cached explanation")
+
+    if lime_result is None:
+        print("[LIME] Generating explanation (this will make multiple API calls)...")
+        lime_result = explainer.explain_instance(
+            input_text=last_user_input,
+            output_text=full_response,
+            segment_type=segment_type,  # Adaptive: "w" for short inputs, "s" for long
+            oversampling_factor=oversampling_factor,  # Adaptive based on segment type
+            max_units_replace=1,  # Keep at 1 for speed
+            num_nonzeros=10  # Show top 10 features (more relevant for word-level)
+        )
+        if cache_key is not None:
+            cache.set("explanation", cache_key, lime_result)
+
+    elapsed_time = time.time() - start_time
+    print(f"[LIME] Explanation complete in {elapsed_time:.2f} seconds")
+    print(f"[LIME] Number of units analyzed: {len(lime_result['attributions']['units'])}")
+
+    return lime_result
+
+
+async def stream_chat(
     client: genai.Client,
     messages: List[Dict[str, str]],
     system_prompt: str,
-    enable_lime: bool = True
+    enable_lime: bool = True,
+    perturbation_profile: Optional[Dict[str, Any]] = None,
+    compact: bool = False,
+    writer: Optional[SSEWriter] = None,
+    cache: Optional[SharedCache] = None
 ):
-    """Stream chat responses using Google Genai with SSE format and LIME explanations."""
-    try:
-        def format_sse(data: dict) -> str:
-            """Format data as Server-Sent Event."""
-            return f"data: {json.dumps(data)}\n\n"
+    """
+    Stream chat responses using Google Genai with SSE format and LIME explanations.
+
+    The answer is streamed with the async Gemini client and its chunks are
+    coalesced by the SSE writer; only the blocking LIME explanation runs in the
+    threadpool. With compact=True (negotiated by the client) attributions are
+    sent as offsets into the input text. With a cache, explanation results are
+    shared across workers.
+    """
+    if writer is None:
+        writer = SSEWriter()
 
+    try:
         # Send start event
-        yield format_sse({"type": "start"})
+        yield writer.event({"type": "start"})
 
         # Convert messages to Gemini format
         gemini_contents = []
@@ -30,7 +136,7 @@ def stream_chat(
             })
 
         # Stream response from Gemini
-        response = client.models.generate_content_stream(
+        response = await client.aio.models.generate_content_stream(
             model="gemini-2.5-flash",
             contents=gemini_contents,
             config={
@@ -42,13 +148,13 @@ def stream_chat(
         full_response = ""
 
         # Stream text chunks
-        for chunk in response:
-            if chunk.text:
-                full_response += chunk.text
-                yield format_sse({"type": "content", "text": chunk.text})
+        texts = (chunk.text async for chunk in response if chunk.text)
+        async for text in writer.coalesce(texts):
+            full_response += text
+            yield writer.content(text)
 
         # Send done event
-        yield format_sse({"type": "done"})
+        yield writer.event({"type": "done"})
 
         # LIME Explanation
         if enable_lime and messages and full_response:
@@ -59,79 +165,40 @@ def stream_chat(
 
                 # Send lime-start event
                 print(f"[LIME] Starting LIME processing for input: {last_user_input[:50]}...")
-                yield format_sse({"type": "lime-start"})
-
-                # Create model wrapper
-                model_wrapper = GeminiModelWrapper(
-                    client=client,
-                    model="gemini-2.5-flash",
-                    system_prompt=system_prompt
-                )
-
-                # Initialize CLIME explainer
-                print("[LIME] Initializing CLIME explainer...")
-                explainer = CLIME(model=model_wrapper, segmenter="en_core_web_sm")
-
-                # Adaptive segment selection based on input length
-                # Count sentences in input
-                import re
-                sentences = re.split(r'[.!?]+', last_user_input.strip())
-                sentences = [s.strip() for s in sentences if s.strip()]
-                num_sentences = len(sentences)
-
-                # Count words in input
-                words = last_user_input.split()
-                num_words = len(words)
-
-                # Decision logic: Use word-level for short inputs, sentence-level for long
-                if num_sentences <= 1 or num_words < 15:
-                    segment_type = "w"  # Word-level for short inputs
-                    oversampling_factor = 1  # Fewer perturbations for word-level (can be many words)
-                    print(f"[LIME] Using WORD-level segmentation (input: {num_words} words, {num_sentences} sentence)")
-                else:
-                    segment_type = "s"  # Sentence-level for longer inputs
-                    oversampling_factor = 2  # More perturbations for sentence-level
-                    print(f"[LIME] Using SENTENCE-level segmentation (input: {num_words} words, {num_sentences} sentences)")
-
-                # Generate explanation
-                # OPTIMIZATION: Lower values = faster but less accurate
-                # - oversampling_factor: Number of perturbations per unit (2-3 = fast, 5-10 = accurate)
-                # - segment_type: "w" for words (more units) or "s" for sentences (fewer units, faster)
-                # - max_units_replace: How many units to mask at once (1 = fastest)
-                print("[LIME] Generating explanation (this will make multiple API calls)...")
-                import time
-                start_time = time.time()
-                lime_result = explainer.explain_instance(
-                    input_text=last_user_input,
-                    output_text=full_response,
-                    segment_type=segment_type,  # Adaptive: "w" for short inputs, "s" for long
-                    oversampling_factor=oversampling_factor,  # Adaptive based on segment type
-                    max_units_replace=1,  # Keep at 1 for speed
-                    num_nonzeros=10  # Show top 10 features (more relevant for word-level)
+                yield writer.event({"type": "lime-start"})
+
+                lime_result = await run_in_threadpool(
+                    explain_response,
+                    client,
+                    last_user_input,
+                    full_response,
+                    system_prompt,
+                    perturbation_profile,
+                    cache
                 )
 
-                elapsed_time = time.time() - start_time
-                print(f"[LIME] Explanation complete in {elapsed_time:.2f} seconds")
-                print(f"[LIME] Number of units analyzed: {len(lime_result['attributions']['units'])}")
-
                 # Convert LIME output to frontend format
                 # Frontend expects: { original_output: string, explanation: [[unit, score], ...], intercept?: number }
                 units = lime_result["attributions"]["units"]
                 scores = lime_result["attributions"]["scores"]
 
-                # Create explanation array as [unit, score] pairs
-                explanation = [[unit, score] for unit, score in zip(units, scores)]
-
                 lime_data = {
                     "original_output": lime_result["output"],
-                    "explanation": explanation,
                     "intercept": lime_result.get("intercept")
                 }
 
+                # Compact encoding: unit offsets into the input and fixed-point scores
+                encoded = encode_attributions(last_user_input, units, scores) if compact else None
+                if encoded is not None:
+                    lime_data["explanation"] = encoded
+                else:
+                    # Create explanation array as [unit, score] pairs
+                    lime_data["explanation"] = [[unit, score] for unit, score in zip(units, scores)]
+
                 # Send lime-complete event with data
-                yield format_sse({"type": "lime-complete", "data": lime_data})
+                yield writer.event({"type": "lime-complete", "data": lime_data})
 
     except Exception as e:
         # Send error event
-        yield format_sse({"type": "error", "error": str(e)})
+        yield writer.event({"type": "error", "error": str(e)})
         raise
\ No newline at end of file
@@ -12,6 +12,33 @@ export interface LimeExplanation {
   intercept?: number
 }
 
+// Compact LIME payload: unit boundaries as offsets into the user input and
+// scores as integers scaled by `scale`
+interface CompactExplanation {
+  format: "offsets"
+  offsets: number[]
+  scores: number[]
+  scale: number
+}
+
+function decodeExplanation(
+  data: Omit<LimeExplanation, "explanation"> & { explanation: LimeExplanation["explanation"] | CompactExplanation },
+  input: string
+): LimeExplanation {
+  const explanation = data.explanation
+  if (Array.isArray(explanation)) {
+    return data as LimeExplanation
+  }
+
+  return {
+    ...data,
+    explanation: explanation.scores.map((score, i): [string, number] => [
+      input.slice(explanation.offsets[i], explanation.offsets[i + 1]),
+      score / explanation.scale,
+    ]),
+  }
+}
+
 export interface LimeHistoryItem {
   id: string
   timestamp: number
@@ -71,6 +98,7 @@ export function useStreamingChat() {
               role: m.role,
               content: m.content,
             })),
+            compact: true,
           }),
         })
 
@@ -132,7 +160,7 @@ export function useStreamingChat() {
                     timestamp: Date.now(),
                     userMessage: userMessageContent,
                     assistantMessage: assistantMessageContent,
-                    explanation: parsed.data
+                    explanation: decodeExplanation(parsed.data, userMessageContent)
                   }
 
                   setLimeHistory((prev) => [...prev, historyItem])